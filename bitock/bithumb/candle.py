@@ -0,0 +1,205 @@
+"""
+체결(transaction) 스트림 기반 OHLCV 캔들 생성기
+
+REST 캔들 히스토리로 한 번 시드한 뒤, 웹소켓 체결 데이터로 해당 시각의 캔들을 갱신하거나 새 캔들을 추가함
+"""
+
+import logging as _logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import *
+
+import bithumb.rest as bithumb_rest
+from bithumb.ws import Transaction, TransactionItem
+
+logger = _logging.getLogger('BithumbCandle')
+
+# pybithumb chart_intervals 값 -> 캔들 길이
+INTERVALS: Dict[str, timedelta] = {
+    '1m': timedelta(minutes=1),
+    '3m': timedelta(minutes=3),
+    '5m': timedelta(minutes=5),
+    '10m': timedelta(minutes=10),
+    '30m': timedelta(minutes=30),
+    '1h': timedelta(hours=1),
+    '6h': timedelta(hours=6),
+    '12h': timedelta(hours=12),
+    '24h': timedelta(hours=24),
+}
+
+
+@dataclass
+class Candle:
+    time: datetime  # 캔들 시작 시각
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    open_time: datetime = None  # 시가를 만든 첫 체결 시각
+    close_time: datetime = None  # 종가를 만든 마지막 체결 시각
+
+
+def parse_cont_dtm(s: str) -> datetime:
+    try:
+        return datetime.strptime(s, '%Y-%m-%d %H:%M:%S.%f')
+    except ValueError:
+        return datetime.strptime(s, '%Y-%m-%d %H:%M:%S')
+
+
+def floor_time(t: datetime, delta: timedelta) -> datetime:
+    """
+    t 가 속한 캔들의 시작 시각 (하루를 delta 단위로 나눔)
+    """
+    day = datetime(t.year, t.month, t.day)
+    return day + ((t - day) // delta) * delta
+
+
+class CandleBuilder:
+    def __init__(self, symbol: str, interval: str = '1m', limit: int = 200):
+        assert interval in INTERVALS, f'Not supported interval: {interval}'
+        self.symbol = symbol  # ex) BTC_KRW
+        self.interval = interval
+        self.delta = INTERVALS[interval]
+        self.candles: Deque[Candle] = deque(maxlen=limit)
+        self.lock = threading.Lock()
+        self.updated: float = None  # 마지막으로 시드했거나 체결을 받은 시각 (time.monotonic)
+
+    def seed(self):
+        """
+        REST 캔들 히스토리로 초기화
+        """
+        order_currency, payment_currency = self.symbol.split('_')
+        df = bithumb_rest.get_candlestick(order_currency, payment_currency, self.interval)
+        if df is None:
+            logger.warning(f'Failed to load candlesticks: {self.symbol}')
+            return self
+
+        rows = df.tail(self.candles.maxlen)
+        with self.lock:
+            self.candles.clear()
+            for t, row in zip(rows.index, rows.itertuples(index=False)):
+                t = t.to_pydatetime()
+                self.candles.append(Candle(time=t,
+                                           open=float(row.open),
+                                           high=float(row.high),
+                                           low=float(row.low),
+                                           close=float(row.close),
+                                           volume=float(row.volume),
+                                           open_time=t,
+                                           close_time=t))
+            self.updated = time.monotonic()
+
+        return self
+
+    def is_stale(self, periods: float = 2) -> bool:
+        """
+        periods 개 캔들 길이 동안 시드도 체결도 없었으면 True (웹소켓이 끊겼거나 거래가 뜸한 종목)
+        """
+        with self.lock:
+            updated = self.updated
+
+        return updated is None or time.monotonic() - updated > self.delta.total_seconds() * periods
+
+    def _add(self, candle: Candle) -> bool:
+        """
+        candle 과 같은 시각의 캔들이 없으면 시각 순서에 맞게 넣거나 버리고 True,
+        이미 있으면 False (self.lock 을 잡은 상태에서 호출)
+        """
+        if not self.candles or candle.time > self.candles[-1].time:
+            self.candles.append(candle)
+            return True
+
+        if candle.time < self.candles[0].time:
+            # 보관하는 캔들보다 오래된 체결은 버림
+            return True
+
+        # 늦게 온 체결은 대부분 최근 캔들에 속하므로 뒤에서부터 찾음
+        for i in range(len(self.candles) - 1, -1, -1):
+            if self.candles[i].time == candle.time:
+                return False
+            if self.candles[i].time < candle.time:
+                # 체결이 없던 구간의 캔들
+                candles = list(self.candles)
+                candles.insert(i + 1, candle)
+                self.candles = deque(candles, maxlen=self.candles.maxlen)
+                return True
+
+    def _get(self, start: datetime) -> Candle:
+        for i in range(len(self.candles) - 1, -1, -1):
+            if self.candles[i].time == start:
+                return self.candles[i]
+
+    def update(self, item: TransactionItem):
+        price = float(item.contPrice)
+        quantity = float(item.contQty)
+        cont_dtm = parse_cont_dtm(item.contDtm)
+        start = floor_time(cont_dtm, self.delta)
+
+        with self.lock:
+            self.updated = time.monotonic()
+            if self._add(Candle(time=start,
+                                open=price,
+                                high=price,
+                                low=price,
+                                close=price,
+                                volume=quantity,
+                                open_time=cont_dtm,
+                                close_time=cont_dtm)):
+                return
+
+            candle = self._get(start)
+            candle.high = max(candle.high, price)
+            candle.low = min(candle.low, price)
+            candle.volume += quantity
+            # 체결이 순서대로 오지 않을 수 있으므로, 가장 이른 체결을 시가, 가장 늦은 체결을 종가로 반영
+            if not candle.open_time or cont_dtm < candle.open_time:
+                candle.open = price
+                candle.open_time = cont_dtm
+            if not candle.close_time or cont_dtm >= candle.close_time:
+                candle.close = price
+                candle.close_time = cont_dtm
+
+    def get_candles(self, count: int = None) -> List[Candle]:
+        with self.lock:
+            candles = list(self.candles)
+
+        return candles[-count:] if count else candles
+
+    def get_closes(self, count: int = None) -> List[float]:
+        return [candle.close for candle in self.get_candles(count)]
+
+
+class CandleAggregator:
+    """
+    여러 종목의 CandleBuilder 묶음, TransactionApi 구독자로 사용
+    """
+
+    def __init__(self, symbols: List[str], interval: str = '1m', limit: int = 200):
+        self.builders: Dict[str, CandleBuilder] = {
+            symbol: CandleBuilder(symbol, interval, limit) for symbol in symbols
+        }
+
+    def seed(self):
+        for builder in self.builders.values():
+            try:
+                builder.seed()
+            except BaseException as e:
+                logger.warning(f'Failed to seed {builder.symbol}: {e}')
+
+        return self
+
+    def on_transaction(self, transaction: Transaction):
+        if not transaction.content or not transaction.content.list:
+            return
+
+        for item in transaction.content.list:
+            builder = self.builders.get(item.symbol)
+            if builder:
+                builder.update(item)
+
+    def get(self, symbol: str) -> CandleBuilder:
+        return self.builders.get(symbol)
@@ -1,10 +1,15 @@
 from dataclasses import dataclass, field
 from typing import *
 
+from pandas import DataFrame
 from pybithumb import Bithumb
 
+from bithumb.ratelimit import TokenBucket
 from jsoner import JsonSerializable, deserialize
 
+# 모든 Bithumb REST 호출이 공유하는 제한 (Public API 초당 135회 이내)
+rate_limiter = TokenBucket(rate=100)
+
 
 @dataclass
 class PriceQuantity(JsonSerializable):
@@ -22,6 +27,17 @@ class OrderBook(JsonSerializable):
 
 
 def get_orderbook(symbol: str, limit=30):
-    raw = Bithumb.get_orderbook(symbol, limit=limit)
+    with rate_limiter:
+        raw = Bithumb.get_orderbook(symbol, limit=limit)
     orderbooks = deserialize(raw, OrderBook)
     return orderbooks
+
+
+def get_candlestick(order_currency: str, payment_currency='KRW', chart_intervals='24h') -> Optional[DataFrame]:
+    with rate_limiter:
+        return Bithumb.get_candlestick(order_currency, payment_currency, chart_intervals)
+
+
+def get_transaction_history(order_currency: str, payment_currency='KRW', limit=20) -> list:
+    with rate_limiter:
+        return Bithumb.get_transaction_history(order_currency, payment_currency, limit)
@@ -0,0 +1,397 @@
+"""
+종목별 최신 상태(티커 + 최우선 호가)를 공유 메모리 테이블로 제공
+
+하나의 피드 프로세스(LatestStateFeed)만 웹소켓을 받아 테이블에 쓰고,
+같은 머신의 여러 전략 프로세스는 LatestStateTable(name) 으로 붙어서 읽기만 함
+
+레이아웃 (little endian)
+  header: magic(8s) capacity(I) owner pid(I) generation(Q)
+  slot  : seq(Q) symbol(16s) updated(q) ticker fields(12d) bid/ask price/quantity(4d)
+
+각 slot 은 seqlock 으로 보호됨: 쓰기 전후로 seq 를 홀수/짝수로 올리고,
+읽는 쪽은 seq 가 짝수이고 읽기 전후로 같을 때까지 다시 읽음 (read_timeout 을 넘기면 TimeoutError)
+"""
+
+import logging as _logging
+import multiprocessing
+import os
+import struct
+import sys
+import threading
+import time
+from dataclasses import astuple, dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import *
+
+import bithumb.rest as bithumb_rest
+from bithumb.ws import OrderBookDepth, OrderBookDepthApi, OrderRequest, TickerApi, TickerData, TickType
+
+logger = _logging.getLogger('BithumbShared')
+
+MAGIC = b'BITOCK01'
+SYMBOL_SIZE = 16
+
+TICKER_FIELDS = [
+    'openPrice',
+    'closePrice',
+    'lowPrice',
+    'highPrice',
+    'value',
+    'volume',
+    'sellVolume',
+    'buyVolume',
+    'prevClosePrice',
+    'chgRate',
+    'chgAmt',
+    'volumePower',
+]
+BOOK_FIELDS = [
+    'bidPrice',
+    'bidQuantity',
+    'askPrice',
+    'askQuantity',
+]
+
+_HEADER = struct.Struct('<8sIIQ')
+_GENERATION_OFFSET = 16
+_SEQ = struct.Struct('<Q')
+_BODY = struct.Struct(f'<{SYMBOL_SIZE}sq{len(TICKER_FIELDS) + len(BOOK_FIELDS)}d')
+_SLOT_SIZE = _SEQ.size + _BODY.size
+
+
+@dataclass
+class LatestState:
+    symbol: str = None
+    updated: int = 0  # 마지막 갱신 시각 (epoch ms)
+    openPrice: float = 0
+    closePrice: float = 0
+    lowPrice: float = 0
+    highPrice: float = 0
+    value: float = 0
+    volume: float = 0
+    sellVolume: float = 0
+    buyVolume: float = 0
+    prevClosePrice: float = 0
+    chgRate: float = 0
+    chgAmt: float = 0
+    volumePower: float = 0
+    bidPrice: float = 0
+    bidQuantity: float = 0
+    askPrice: float = 0
+    askQuantity: float = 0
+
+
+def _shares_tracker(owner_pid: int) -> bool:
+    """
+    owner 의 resource_tracker 를 같이 쓰는 프로세스(owner 자신 또는 owner 가 multiprocessing 으로 띄운 자식)인지
+
+    subprocess 등으로 띄운 프로세스는 부모가 owner 여도 자기 tracker 를 따로 씀
+    """
+    parent = multiprocessing.parent_process()
+    return owner_pid == os.getpid() or (parent is not None and parent.pid == owner_pid)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    읽기용으로 붙음, 이 프로세스가 종료될 때 resource_tracker 가 테이블을 지우지 않도록 함
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    shm = shared_memory.SharedMemory(name=name)
+    _, _, owner_pid, _ = _HEADER.unpack_from(shm.buf, 0)
+    # tracker 를 같이 쓰면 owner 의 등록까지 지워지므로, 따로 쓰는 프로세스에서만 등록을 취소함
+    # (POSIX 에서만 등록되며, 등록 이름은 앞에 '/' 가 붙은 이름)
+    if os.name == 'posix' and not _shares_tracker(owner_pid):
+        resource_tracker.unregister('/' + shm.name, 'shared_memory')
+
+    return shm
+
+
+class LatestStateTable:
+    """
+    symbols 를 주면 테이블을 새로 만들고(쓰기용), 없으면 이미 만들어진 테이블에 붙음(읽기용)
+    """
+
+    def __init__(self, name: str, symbols: List[str] = None, read_timeout: float = 1):
+        self.name = name
+        self.read_timeout = read_timeout
+        self.owner = symbols is not None
+        if self.owner:
+            size = _HEADER.size + _SLOT_SIZE * len(symbols)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            _HEADER.pack_into(self.shm.buf, 0, MAGIC, len(symbols), os.getpid(), 0)
+            self.states: List[LatestState] = []
+            for i, symbol in enumerate(symbols):
+                state = LatestState(symbol=symbol)
+                self.states.append(state)
+                self._pack(i, state)
+        else:
+            self.shm = _attach(name)
+            magic, capacity, _, _ = _HEADER.unpack_from(self.shm.buf, 0)
+            assert magic == MAGIC, f'Not a latest state table: {name}'
+            symbols = [self._read_slot(i).symbol for i in range(capacity)]
+
+        self.symbols = symbols
+        self.index: Dict[str, int] = {symbol: i for i, symbol in enumerate(symbols)}
+
+    @staticmethod
+    def _offset(i: int) -> int:
+        return _HEADER.size + _SLOT_SIZE * i
+
+    def _pack(self, i: int, state: LatestState):
+        values = astuple(state)
+        _BODY.pack_into(self.shm.buf,
+                        self._offset(i) + _SEQ.size,
+                        values[0].encode('utf-8')[:SYMBOL_SIZE],
+                        *values[1:])
+
+    def _read_slot(self, i: int) -> LatestState:
+        buf = self.shm.buf
+        offset = self._offset(i)
+        deadline = time.monotonic() + self.read_timeout
+        while True:
+            seq, = _SEQ.unpack_from(buf, offset)
+            if not seq & 1:  # 홀수면 쓰는 중
+                values = _BODY.unpack_from(buf, offset + _SEQ.size)
+                if _SEQ.unpack_from(buf, offset)[0] == seq:
+                    break
+
+            if time.monotonic() > deadline:
+                # 피드 프로세스가 쓰는 도중에 죽었을 수 있음
+                raise TimeoutError(f'Slot {i} of {self.name} has been locked for {self.read_timeout}s')
+
+        return LatestState(values[0].rstrip(b'\0').decode('utf-8'), *values[1:])
+
+    def write(self, symbol: str, **fields):
+        """
+        symbol 의 일부 필드를 갱신함, 쓰기는 한 프로세스의 한 스레드에서만 해야 함
+        """
+        assert self.owner, 'Only the owner of the table can write'
+        i = self.index.get(symbol)
+        if i is None:
+            return
+
+        state = self.states[i]
+        for n, v in fields.items():
+            setattr(state, n, v)
+        state.updated = int(time.time() * 1000)
+
+        buf = self.shm.buf
+        offset = self._offset(i)
+        seq, = _SEQ.unpack_from(buf, offset)
+        _SEQ.pack_into(buf, offset, seq + 1)
+        self._pack(i, state)
+        _SEQ.pack_into(buf, offset, seq + 2)
+
+        generation, = _SEQ.unpack_from(buf, _GENERATION_OFFSET)
+        _SEQ.pack_into(buf, _GENERATION_OFFSET, generation + 1)
+
+    def read(self, symbol: str) -> Optional[LatestState]:
+        """
+        slot 이 read_timeout 동안 쓰기 중이면 TimeoutError
+        """
+        i = self.index.get(symbol)
+        return None if i is None else self._read_slot(i)
+
+    def get_seq(self, symbol: str) -> int:
+        return _SEQ.unpack_from(self.shm.buf, self._offset(self.index[symbol]))[0]
+
+    def get_generation(self) -> int:
+        """
+        테이블 전체의 쓰기 횟수, 바뀌었으면 어떤 종목이든 갱신된 것
+        """
+        return _SEQ.unpack_from(self.shm.buf, _GENERATION_OFFSET)[0]
+
+    def wait_for_change(self, generation: int, timeout: float = None, interval: float = 0.001) -> int:
+        """
+        generation 이후 쓰기가 있을 때까지 기다린 뒤 현재 generation 을 리턴함, timeout 이면 그대로 리턴
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self.get_generation()
+            if current != generation:
+                return current
+            if deadline is not None and time.monotonic() >= deadline:
+                return current
+
+            time.sleep(interval)
+
+    def get_changes(self, seqs: Dict[str, int]) -> List[str]:
+        """
+        seqs(종목 -> 마지막으로 본 seq) 이후 갱신된 종목들, seqs 는 현재 값으로 갱신됨
+        """
+        changed = []
+        for symbol in self.symbols:
+            seq = self.get_seq(symbol)
+            if seqs.get(symbol) != seq:
+                seqs[symbol] = seq
+                changed.append(symbol)
+
+        return changed
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _to_ms(t) -> Optional[int]:
+    """
+    웹소켓 호가 datetime(μs) 또는 REST 호가 timestamp(ms) 를 ms 로 맞춤
+    """
+    if t is None:
+        return None
+
+    t = int(t)
+    return t // 1000 if t > 10 ** 14 else t
+
+
+class LatestStateFeed:
+    """
+    TickerApi, OrderBookDepthApi 를 한 번만 구독하여 LatestStateTable 에 씀
+
+    호가 변경분은 가격별 절대 수량이므로 순서가 바뀌면 호가창이 틀어짐,
+    그래서 두 API 모두 받은 순서대로 한 스레드에서 처리함
+    """
+
+    def __init__(self, name: str, symbols: List[str], tick_type: TickType = TickType.DAY):
+        self.table = LatestStateTable(name, symbols)
+        self.books: Dict[str, Dict[str, Dict[float, float]]] = {
+            symbol: {'bid': {}, 'ask': {}} for symbol in symbols
+        }
+        # 스냅샷을 받는 중인 종목의 호가 변경분 (수신 시각 ms, 변경분)
+        self.pending: Dict[str, List[Tuple[Optional[int], OrderRequest]]] = {}
+        # 종목별 스냅샷 시각(ms), 이보다 오래된 변경분은 버림
+        self.snapshots: Dict[str, int] = {}
+        # 두 API 의 구독자 스레드와 seed 가 함께 쓰므로, 테이블 쓰기는 하나씩
+        self.lock = threading.Lock()
+        self.threads: List[threading.Thread] = []
+        self.ticker_api = TickerApi(symbols, [tick_type]).subscribe(self.on_ticker)
+        self.order_book_api = OrderBookDepthApi(symbols, [tick_type]).subscribe(self.on_order_book_depth)
+
+    def seed(self):
+        """
+        REST 호가 스냅샷으로 호가창을 채움, start() 이후에 호출해야 함
+
+        스냅샷을 받는 동안 들어온 변경분은 모아 두었다가 스냅샷보다 새로운 것만 다시 적용하고,
+        그 뒤에 늦게 도착한 스냅샷 이전의 변경분은 버림
+        (start() 전에 부르면 그 사이에 사라진 호가의 변경분을 받을 수 없어 호가창에 남음)
+        """
+        for symbol in self.table.symbols:
+            with self.lock:
+                self.pending[symbol] = []
+
+            order_currency, _ = symbol.split('_')
+            try:
+                orderbook = bithumb_rest.get_orderbook(order_currency)
+            except BaseException as e:
+                logger.warning(f'Failed to load orderbook {symbol}: {e}')
+                orderbook = None
+
+            with self.lock:
+                pending = self.pending.pop(symbol)
+                if orderbook:
+                    snapshot = _to_ms(orderbook.timestamp) or 0
+                    book = self.books[symbol]
+                    book['bid'] = {float(bid.price): float(bid.quantity) for bid in orderbook.bids}
+                    book['ask'] = {float(ask.price): float(ask.quantity) for ask in orderbook.asks}
+                    self.snapshots[symbol] = snapshot
+                    pending = [(t, order) for t, order in pending if t is None or t >= snapshot]
+
+                for _, order in pending:
+                    self._apply(order)
+                self._write_top(symbol)
+
+        return self
+
+    def _apply(self, order: OrderRequest):
+        """
+        self.lock 을 잡은 상태에서 호출해야 함
+        """
+        book = self.books[order.symbol]
+        price = float(order.price)
+        quantity = float(order.quantity)
+        if not quantity:
+            book[order.orderType].pop(price, None)
+            return
+
+        book[order.orderType][price] = quantity
+        # 가장 최근 변경분이 맞다고 보고, 반대편에서 이 가격과 겹치는 호가(변경분을 놓친 호가)를 지움
+        if order.orderType == 'bid':
+            for ask in [ask for ask in book['ask'] if ask <= price]:
+                del book['ask'][ask]
+        else:
+            for bid in [bid for bid in book['bid'] if bid >= price]:
+                del book['bid'][bid]
+
+    def _write_top(self, symbol: str):
+        """
+        self.lock 을 잡은 상태에서 호출해야 함
+        """
+        book = self.books[symbol]
+        bid = max(book['bid']) if book['bid'] else 0
+        ask = min(book['ask']) if book['ask'] else 0
+        self.table.write(symbol,
+                         bidPrice=bid,
+                         bidQuantity=book['bid'].get(bid, 0),
+                         askPrice=ask,
+                         askQuantity=book['ask'].get(ask, 0))
+
+    def on_ticker(self, data: TickerData):
+        content = data.content
+        if not content or not content.symbol:
+            return
+
+        fields = {}
+        for n in TICKER_FIELDS:
+            v = getattr(content, n)
+            if v is not None:
+                fields[n] = float(v)
+
+        with self.lock:
+            self.table.write(content.symbol, **fields)
+
+    def on_order_book_depth(self, data: OrderBookDepth):
+        if not data.content or not data.content.list:
+            return
+
+        t = _to_ms(data.content.datetime)
+        changed = set()
+        with self.lock:
+            for order in data.content.list:
+                book = self.books.get(order.symbol)
+                if book is None or order.orderType not in book:
+                    continue
+
+                if order.symbol in self.pending:
+                    self.pending[order.symbol].append((t, order))
+                    continue
+
+                if t is not None and t < self.snapshots.get(order.symbol, 0):
+                    continue
+
+                self._apply(order)
+                changed.add(order.symbol)
+
+            for symbol in changed:
+                self._write_top(symbol)
+
+    def start(self):
+        self.threads = [
+            threading.Thread(target=self.ticker_api.connect, args=(1,)),
+            threading.Thread(target=self.order_book_api.connect, args=(1,)),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+        return self
+
+    def stop(self):
+        self.ticker_api.disconnect()
+        self.order_book_api.disconnect()
+        # 구독자가 모두 끝난 뒤에 테이블을 지움
+        for thread in self.threads:
+            thread.join()
+
+        self.table.close()
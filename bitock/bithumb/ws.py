@@ -1,10 +1,10 @@
 import logging as _logging
 import threading
 import time
-from dataclasses import dataclass
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
 from enum import Enum
 from multiprocessing.pool import ThreadPool
-from queue import Queue
 from typing import *
 
 import websocket
@@ -69,23 +69,127 @@ class TickerData(ApiData):
     content: TickerDataContent = None
 
 
+class OverflowPolicy(Enum):
+    CONFLATE = 'conflate'  # 같은 키(종목)는 가장 최근 데이터만 남김
+    DROP_OLDEST = 'drop_oldest'  # 가득 차면 가장 오래된 데이터를 버림
+    DROP_NEWEST = 'drop_newest'  # 가득 차면 새로 받은 데이터를 버림
+    BLOCK = 'block'  # 가득 차면 빈 자리가 생길 때까지 수신을 멈춤
+
+
+@dataclass
+class QueueStats:
+    received: int = 0
+    delivered: int = 0
+    conflated: int = 0
+    dropped: int = 0
+    size: int = 0
+    last_age: float = 0  # 마지막으로 꺼낸 데이터가 큐에서 기다린 시간(초)
+    max_age: float = 0  # 마지막 reset 이후 가장 오래 기다린 시간(초)
+
+
+class MessageQueue:
+    """
+    수신 스레드와 구독자 사이의 큐, 구독자가 밀릴 때 policy 에 따라 데이터를 합치거나 버림
+    """
+
+    def __init__(self,
+                 maxsize: int = 0,
+                 policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                 key: Callable[[Any], Hashable] = None):
+        assert policy != OverflowPolicy.CONFLATE or key, 'A key is required to conflate'
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        self.items: Union[OrderedDict, Deque] = OrderedDict() if policy == OverflowPolicy.CONFLATE else deque()
+        self.cond = threading.Condition()
+        self.stats = QueueStats()
+        self.closed = False
+
+    def put(self, data):
+        with self.cond:
+            self.stats.received += 1
+            if self.policy == OverflowPolicy.CONFLATE:
+                key = self.key(data)
+                if key in self.items:
+                    # 자리는 그대로 두고 값만 최신으로 바꿈
+                    self.items[key] = (time.monotonic(), data)
+                    self.stats.conflated += 1
+                    return
+
+                self.items[key] = (time.monotonic(), data)
+            else:
+                while self.maxsize and len(self.items) >= self.maxsize and not self.closed:
+                    if self.policy == OverflowPolicy.DROP_NEWEST:
+                        self.stats.dropped += 1
+                        return
+                    elif self.policy == OverflowPolicy.DROP_OLDEST:
+                        self.items.popleft()
+                        self.stats.dropped += 1
+                    else:
+                        self.cond.wait()
+
+                self.items.append((time.monotonic(), data))
+
+            self.cond.notify_all()
+
+    def get(self, timeout: float = None):
+        """
+        데이터가 없으면 timeout 만큼 기다리고, 그래도 없거나 닫혔으면 None
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items or self.closed, timeout) or not self.items:
+                return None
+
+            if self.policy == OverflowPolicy.CONFLATE:
+                _, (received, data) = self.items.popitem(last=False)
+            else:
+                received, data = self.items.popleft()
+
+            age = time.monotonic() - received
+            self.stats.delivered += 1
+            self.stats.last_age = age
+            self.stats.max_age = max(self.stats.max_age, age)
+            self.cond.notify_all()
+            return data
+
+    def get_stats(self, reset=False) -> QueueStats:
+        with self.cond:
+            stats = replace(self.stats, size=len(self.items))
+            if reset:
+                self.stats.max_age = 0
+
+            return stats
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
 class WsApi(Generic[T]):
     def __init__(self,
                  subscription_request: SubscriptionRequestData,
-                 type_hint: Type[JsonSerializable]):
+                 type_hint: Type[JsonSerializable],
+                 queue: MessageQueue = None,
+                 report_interval: float = 60):
         self.uri = 'wss://pubwss.bithumb.com/pub/ws'
         self.subscription_request = subscription_request
         self.type_hint = type_hint
         self.ws = websocket.WebSocket()
         self.subscribers: List[Callable[[T]], None] = []
         self.stopped = False
-        self.queue = Queue()
+        self.queue = queue or MessageQueue()
+        self.report_interval = report_interval
+        self.reported_dropped = 0
 
     def subscribe(self, subscriber: Callable[[T], None]):
         self.subscribers.append(subscriber)
         return self
 
-    def connect(self):
+    def connect(self, processes=8):
+        """
+        processes 는 구독자를 동시에 호출하는 스레드 수, 1 이면 받은 순서대로 하나씩 호출함
+        """
         logger.info(f'Connecting to Bithumb Websocket API...')
         self.ws.connect(self.uri)
         logger.info(f'Connection Response: {self.ws.recv()}')
@@ -93,52 +197,103 @@ class WsApi(Generic[T]):
         logger.info(f'Subscription Response: {self.ws.recv()}')
 
         self.start_receive()
-        self.start_consume()
+        self.start_consume(processes)
 
     def start_receive(self):
         def in_thread():
-            while not self.stopped:
-                # 구독자 없으면, 데이터 받지 않음
-                if not self.subscribers:
-                    time.sleep(0.5)
-                    continue
-
-                received = self.ws.recv()
-                data = deserialize(received, self.type_hint)
-                self.queue.put(data)
-
-            self.ws.close()
+            try:
+                while not self.stopped:
+                    # 구독자 없으면, 데이터 받지 않음
+                    if not self.subscribers:
+                        time.sleep(0.5)
+                        continue
+
+                    received = self.ws.recv()
+                    data = deserialize(received, self.type_hint)
+                    self.queue.put(data)
+            except BaseException as e:
+                logger.error(f'{self.subscription_request.type}: failed to receive: {e}')
+            finally:
+                logger.warning(f'{self.subscription_request.type}: receive thread stopped')
+                self.ws.close()
 
         threading.Thread(target=in_thread).start()
 
-    def start_consume(self):
-        def consume(data):
-            for subscriber in self.subscribers:
-                subscriber(data)
+    def start_consume(self, processes=8):
+        # 처리 중인 데이터를 processes 개로 제한하여, 밀린 데이터는 self.queue 에 남아 policy 가 적용되도록 함
+        slots = threading.Semaphore(processes)
 
-        with ThreadPool(processes=8) as pool:
+        def consume(data):
+            try:
+                # 한 구독자가 실패해도 나머지 구독자는 데이터를 받아야 함
+                for subscriber in self.subscribers:
+                    try:
+                        subscriber(data)
+                    except BaseException as e:
+                        logger.warning(f'Failed to consume: {e}')
+            finally:
+                slots.release()
+
+        reported = time.monotonic()
+        with ThreadPool(processes=processes) as pool:
             while not self.stopped:
-                received = self.queue.get()
-
-                pool.apply_async(lambda: consume(received))
+                slots.acquire()
+                received = self.queue.get(timeout=1)
+                if received is None:
+                    slots.release()
+                else:
+                    pool.apply_async(consume, (received,))
+
+                if self.report_interval and time.monotonic() - reported >= self.report_interval:
+                    self.report()
+                    reported = time.monotonic()
+
+            # 처리 중인 데이터는 끝까지 구독자에게 전달한 뒤 리턴
+            pool.close()
+            pool.join()
+
+    def report(self):
+        stats = self.queue.get_stats(reset=True)
+        if stats.dropped > self.reported_dropped:
+            # 모든 데이터가 필요한 구독자(ex. 캔들)는 버려진 만큼 틀어지므로 눈에 띄게 남김
+            logger.warning(f'{self.subscription_request.type}: '
+                           f'{stats.dropped - self.reported_dropped} messages dropped, {stats}')
+        else:
+            logger.info(f'{self.subscription_request.type}: {stats}')
+
+        self.reported_dropped = stats.dropped
+        return stats
 
     def disconnect(self):
         self.stopped = True
+        self.queue.close()
 
     def get_records(self):
         pass
 
 
+def _ticker_key(data: TickerData):
+    if not data.content:
+        return None
+
+    return data.content.symbol, data.content.tickType
+
+
 class TickerApi(WsApi[TickerData]):
 
-    def __init__(self, symbols: List[str], tick_types: List[TickType]):
+    def __init__(self,
+                 symbols: List[str],
+                 tick_types: List[TickType],
+                 queue_size=0,
+                 overflow: OverflowPolicy = OverflowPolicy.CONFLATE):
         sub_req = SubscriptionRequestData(
             type='ticker',
             symbols=symbols,
             tickTypes=[tick_type.value for tick_type in tick_types]
         )
 
-        super().__init__(sub_req, TickerData)
+        # 티커는 최신 값만 의미 있으므로, 기본적으로 종목/틱 타입별로 합침 (CONFLATE 는 queue_size 무시)
+        super().__init__(sub_req, TickerData, MessageQueue(maxsize=queue_size, policy=overflow, key=_ticker_key))
 
 
 @dataclass
@@ -166,14 +321,18 @@ class OrderBookDepthApi(WsApi[OrderBookDepth]):
 
     def __init__(self,
                  symbols: List[str],
-                 tick_types: List[TickType]):
+                 tick_types: List[TickType],
+                 queue_size=1000,
+                 overflow: OverflowPolicy = OverflowPolicy.BLOCK):
+        assert overflow != OverflowPolicy.CONFLATE, 'Order book depths cannot be conflated'
         sub_req = SubscriptionRequestData(
             type='orderbookdepth',
             symbols=symbols,
             tickTypes=[tick_type.value for tick_type in tick_types]
         )
 
-        super().__init__(sub_req, OrderBookDepth)
+        # 호가 변경분은 버리면 호가창이 틀어지므로, 기본적으로 가득 차면 수신을 멈춤
+        super().__init__(sub_req, OrderBookDepth, MessageQueue(maxsize=queue_size, policy=overflow))
 
 
 @dataclass
@@ -202,20 +361,29 @@ class TransactionApi(WsApi[Transaction]):
     def __init__(self,
                  symbols,
                  tick_types: List[TickType],
-                 record_limit=100):
+                 record_limit=100,
+                 queue_size=1000,
+                 overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST):
+        assert overflow != OverflowPolicy.CONFLATE, 'Transactions cannot be conflated'
         sub_req = SubscriptionRequestData(
             type='transaction',
             symbols=symbols,
             tickTypes=[tick_type.value for tick_type in tick_types]
         )
 
-        super().__init__(sub_req, Transaction)
-        self.records: Dict[str, Queue] = {}
+        super().__init__(sub_req, Transaction, MessageQueue(maxsize=queue_size, policy=overflow))
+        # 여러 구독자 스레드에서 동시에 넣으므로, 가득 차면 가장 오래된 기록이 알아서 빠지는 deque 사용
+        self.records: Dict[str, Deque[TransactionItem]] = {}
         for symbol in symbols:
-            self.records.update({symbol: Queue(maxsize=record_limit)})
+            self.records.update({symbol: deque(maxlen=record_limit)})
 
         def update(transaction: Transaction):
+            if not transaction.content or not transaction.content.list:
+                return
+
             for item in transaction.content.list:
-                self.records.get(item.symbol).put(item)
+                records = self.records.get(item.symbol)
+                if records is not None:
+                    records.append(item)
 
         self.subscribe(update)
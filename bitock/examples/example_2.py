@@ -6,16 +6,28 @@ import argparse
 import logging
 import logging.handlers
 import threading
+import time
 from datetime import datetime, timedelta
 from enum import Enum
-from multiprocessing.pool import ThreadPool
 
-from pandas import DataFrame
 from pybithumb import Bithumb
 
+import bithumb.candle as bithumb_candle
+import bithumb.rest as bithumb_rest
+import bithumb.ws as bithumb_websock
+from scheduler import Scheduler, Task
+
 PAYMENT_CURRENCY = 'KRW'
 
+# 보유/변동성 큰 종목은 자주, 나머지는 드물게 확인
+HOLDING_INTERVAL = 1
+VOLATILE_INTERVAL = 2
+IDLE_INTERVAL = 10
+VOLATILITY_THRESHOLD = 1  # 마지막 캔들 고저 폭(%)
+DEADLINE = 15
+
 TICKERS = Bithumb.get_tickers(PAYMENT_CURRENCY)
+SYMBOLS = [f'{ticker}_{PAYMENT_CURRENCY}' for ticker in TICKERS]
 
 DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 LOG_FORMAT = '%(asctime)s, %(levelname)s, %(message)s'
@@ -55,7 +67,7 @@ def _current_price(ticker):
         except:
             return datetime.strptime(s, '%Y-%m-%d %H:%M:%S')
 
-    transactions: list = Bithumb.get_transaction_history(ticker)
+    transactions: list = bithumb_rest.get_transaction_history(ticker, PAYMENT_CURRENCY)
     now = datetime.now()
     transactions = list(
         filter(
@@ -77,15 +89,43 @@ class Decision(Enum):
 
 class Simulator:
 
-    def __init__(self, ticker):
+    def __init__(self, ticker, candle_builder: bithumb_candle.CandleBuilder):
         self.ticker = ticker
+        self.candle_builder = candle_builder
         self.holding = False
         self.buy_price = 0
         self.magic_value = None  # 여기다 내맘대로 넣을거임
 
+    def is_volatile(self) -> bool:
+        candles = self.candle_builder.get_candles(1)
+        if not candles or not candles[-1].low:
+            return False
+
+        return (candles[-1].high / candles[-1].low - 1) * 100 > VOLATILITY_THRESHOLD
+
+    def poll_priority(self) -> int:
+        if self.holding:
+            return 0
+        elif self.is_volatile():
+            return 1
+        else:
+            return 2
+
+    def poll_interval(self) -> float:
+        return [HOLDING_INTERVAL, VOLATILE_INTERVAL, IDLE_INTERVAL][self.poll_priority()]
+
     def decide(self) -> [Decision, float]:
-        candlesticks: DataFrame = Bithumb.get_candlestick(order_currency=self.ticker, chart_instervals=args.tick)
-        close_list = candlesticks.get('close').values.tolist()
+        if self.candle_builder.is_stale():
+            # 체결이 끊기면 캔들이 멈춰 있으므로, REST 로 다시 채우고 그래도 안 되면 판단하지 않음
+            logging.warning(f'{self.ticker}, candles are stale, reseeding')
+            if self.candle_builder.seed().is_stale():
+                return
+
+        candles = self.candle_builder.get_candles(21)
+        if len(candles) < 21:
+            return
+
+        close_list = [candle.close for candle in candles]
 
         # 현재가(마지막 스틱의 종가)
         cur_price = close_list[-1]
@@ -103,10 +143,10 @@ class Simulator:
         decision = None
         return_rate = 0
         if not self.holding and cur_price > cur_ma_20 and prv_price < prv_ma_20:
-            if self.magic_value and self.magic_value == candlesticks.index[-2]:
+            if self.magic_value and self.magic_value == candles[-2].time:
                 return
 
-            self.magic_value = candlesticks.index[-2]
+            self.magic_value = candles[-2].time
             decision = Decision.BUY
             self.holding = True
             self.buy_price = cur_price
@@ -137,22 +177,33 @@ class Simulator:
 
 
 def main():
-    simulators = []
-    for ticker in TICKERS:
-        simulators.append(Simulator(ticker))
-
-    while True:
-        delay_looker = threading.Timer(15, lambda: logging.warning('DELAY OCCURS'))
-        delay_looker.start()
-        with ThreadPool(processes=8) as pool:
-            def run(sml):
-                try:
-                    sml.decide()
-                except BaseException as e:
-                    logging.warning(str(e))
-
-            pool.map(run, simulators)
-        delay_looker.cancel()
+    candle_aggregator = bithumb_candle.CandleAggregator(SYMBOLS, interval=args.tick).seed()
+    # 캔들은 모든 체결이 필요하므로, 밀려도 버리지 않고 수신을 멈춤
+    transaction_api = bithumb_websock.TransactionApi(SYMBOLS,
+                                                     [bithumb_websock.TickType.H_HOUR],
+                                                     overflow=bithumb_websock.OverflowPolicy.BLOCK)
+    transaction_api.subscribe(candle_aggregator.on_transaction)
+    threading.Thread(target=transaction_api.connect).start()
+
+    scheduler = Scheduler(processes=8)
+    for ticker, symbol in zip(TICKERS, SYMBOLS):
+        simulator = Simulator(ticker, candle_aggregator.get(symbol))
+        scheduler.add(Task(name=ticker,
+                           func=simulator.decide,
+                           interval=simulator.poll_interval,
+                           priority=simulator.poll_priority,
+                           deadline=DEADLINE))
+
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logging.warning('STOPPED')
+        scheduler.stop()
+        transaction_api.disconnect()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging as _logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing.pool import ThreadPool
+from typing import *
+
+# Task 에서 REST 호출 속도를 맞출 때 함께 쓰도록 노출함
+from bithumb.ratelimit import TokenBucket
+
+logger = _logging.getLogger('Scheduler')
+
+
+class Task:
+    """
+    interval 초마다 실행되는 작업
+
+    interval, priority 는 값 또는 매 실행 후 다시 평가되는 함수, priority 는 작을수록 먼저 실행됨
+    deadline 은 예정 시각부터 실행 완료까지 허용되는 시간(초), 없으면 interval 과 같음
+    """
+
+    def __init__(self,
+                 name: str,
+                 func: Callable[[], Any],
+                 interval: Union[float, Callable[[], float]],
+                 priority: Union[int, Callable[[], int]] = 0,
+                 deadline: float = None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.priority = priority
+        self.deadline = deadline
+
+    def get_interval(self) -> float:
+        return self.interval() if callable(self.interval) else self.interval
+
+    def get_priority(self) -> int:
+        return self.priority() if callable(self.priority) else self.priority
+
+    def get_deadline(self) -> float:
+        return self.deadline if self.deadline is not None else self.get_interval()
+
+
+@dataclass
+class DeadlineMiss:
+    name: str
+    scheduled: float  # 예정 시각 (time.monotonic)
+    started: float  # 실행 시작 시각 (time.monotonic)
+    elapsed: float  # 예정 시각부터 완료(실행 중이면 발견)까지 걸린 시간(초)
+    deadline: float
+    running: bool = False  # 발견했을 때 아직 실행 중이었는지
+
+
+@dataclass(order=True)
+class _Entry:
+    due: float
+    seq: int
+    task: Task = field(compare=False)
+    priority: int = field(default=0, compare=False)  # 큐에 넣을 때 평가한 priority
+    deadline: float = field(default=0, compare=False)
+    started: float = field(default=None, compare=False)
+    missed: bool = field(default=False, compare=False)
+
+
+def _evaluate(task: Task, getter: Callable[[], Any], default: Any) -> Any:
+    """
+    사용자 함수일 수 있는 interval/priority/deadline 을 평가함, 실패하면 로그를 남기고 default
+    """
+    try:
+        return getter()
+    except BaseException as e:
+        logger.warning(f'{task.name}: failed to evaluate {getter.__name__}: {e}')
+        return default
+
+
+class Scheduler:
+    """
+    하나의 워커 풀을 계속 사용하여 Task 들을 주기적으로 실행함
+
+    워커가 비었을 때만 다음 작업을 꺼내므로, 실행할 작업이 밀리면 priority 가 작은 작업부터 실행됨
+    실행 중인 작업은 watchdog 이 check_interval 마다 확인하여, 끝나지 않아도 deadline 을 넘기면 기록함
+    """
+
+    def __init__(self, processes: int = 8, miss_limit: int = 1000, check_interval: float = 1):
+        self.processes = processes
+        self.check_interval = check_interval
+        self.pool: Optional[ThreadPool] = None
+        self.slots = threading.Semaphore(processes)
+        self.cond = threading.Condition()
+        self.entries: List[_Entry] = []
+        self.running: Dict[int, _Entry] = {}
+        self.seq = itertools.count()
+        self.misses: Deque[DeadlineMiss] = deque(maxlen=miss_limit)
+        self.threads: List[threading.Thread] = []
+        self.stopped = False
+
+    def add(self, task: Task, delay: float = 0):
+        priority = _evaluate(task, task.get_priority, 0)
+        deadline = _evaluate(task, task.get_deadline, None)
+        with self.cond:
+            heapq.heappush(self.entries, _Entry(due=time.monotonic() + delay,
+                                                seq=next(self.seq),
+                                                task=task,
+                                                priority=priority,
+                                                deadline=deadline))
+            self.cond.notify_all()
+
+        return self
+
+    def start(self):
+        self.stopped = False
+        self.pool = ThreadPool(processes=self.processes)
+        self.threads = [
+            threading.Thread(target=self._dispatch, daemon=True),
+            threading.Thread(target=self._watch, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+        return self
+
+    def stop(self):
+        """
+        새 작업 실행을 멈추고, 실행 중인 작업이 끝날 때까지 기다림
+        """
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+        # 디스패처가 더 이상 pool 에 넣지 않는 것을 확인한 뒤에 pool 을 닫음
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+        if self.pool:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def _pop_ready(self) -> Optional[_Entry]:
+        """
+        실행 시각이 된 작업 중 priority 가 가장 작은 작업, 없으면 다음 예정 시각까지 기다림
+        self.cond 를 잡은 상태에서 호출해야 함
+        """
+        while not self.stopped:
+            now = time.monotonic()
+            if self.entries and self.entries[0].due <= now:
+                ready = [entry for entry in self.entries if entry.due <= now]
+                entry = min(ready, key=lambda e: (e.priority, e.due, e.seq))
+                self.entries.remove(entry)
+                heapq.heapify(self.entries)
+                return entry
+
+            self.cond.wait(self.entries[0].due - now if self.entries else None)
+
+        return None
+
+    def _dispatch(self):
+        pool = self.pool
+        while not self.stopped:
+            # 워커가 모두 멈춰 있어도 stop 을 알아챌 수 있도록 기다리는 시간을 제한함
+            if not self.slots.acquire(timeout=self.check_interval):
+                continue
+
+            with self.cond:
+                entry = self._pop_ready()
+                if not entry:
+                    self.slots.release()
+                    break
+
+                # stop 은 이 스레드가 끝난 뒤에 pool 을 닫으므로, 여기서는 항상 열려 있음
+                entry.started = time.monotonic()
+                self.running[entry.seq] = entry
+                pool.apply_async(self._run, (entry,))
+
+    def _miss(self, entry: _Entry, now: float, running: bool):
+        """
+        self.cond 를 잡은 상태에서 호출해야 함
+        """
+        entry.missed = True
+        miss = DeadlineMiss(name=entry.task.name,
+                            scheduled=entry.due,
+                            started=entry.started,
+                            elapsed=now - entry.due,
+                            deadline=entry.deadline,
+                            running=running)
+        self.misses.append(miss)
+        logger.warning(f'DEADLINE MISSED: {miss}')
+
+    def _watch(self):
+        with self.cond:
+            while not self.stopped:
+                now = time.monotonic()
+                for entry in self.running.values():
+                    if not entry.missed and entry.deadline is not None and now - entry.due > entry.deadline:
+                        self._miss(entry, now, running=True)
+
+                self.cond.wait(self.check_interval)
+
+    def _run(self, entry: _Entry):
+        task = entry.task
+        try:
+            task.func()
+        except BaseException as e:
+            logger.warning(f'{task.name}: {e}')
+        finally:
+            self.slots.release()
+
+        with self.cond:
+            self.running.pop(entry.seq, None)
+            now = time.monotonic()
+            if not entry.missed and entry.deadline is not None and now - entry.due > entry.deadline:
+                self._miss(entry, now, running=False)
+
+        if not self.stopped:
+            self.add(task, delay=_evaluate(task, task.get_interval, 0))
+
+    def get_misses(self) -> List[DeadlineMiss]:
+        with self.cond:
+            return list(self.misses)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 패키지 안의 모듈들은 bitock 디렉토리를 기준으로 import 함 (ex. from jsoner import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bitock'))
@@ -0,0 +1,89 @@
+import threading
+from datetime import datetime
+
+from bithumb.candle import CandleBuilder, floor_time, INTERVALS
+from bithumb.ws import TickType, Transaction, TransactionApi, TransactionContent, TransactionItem
+
+
+def trade(price, quantity, cont_dtm, symbol='BTC_KRW'):
+    return TransactionItem(symbol=symbol, contPrice=str(price), contQty=str(quantity), contDtm=cont_dtm)
+
+
+def summary(builder):
+    return [(c.time.strftime('%H:%M'), c.open, c.high, c.low, c.close, c.volume) for c in builder.get_candles()]
+
+
+def test_floor_time():
+    t = datetime(2021, 1, 1, 10, 47, 30)
+    assert floor_time(t, INTERVALS['1m']) == datetime(2021, 1, 1, 10, 47)
+    assert floor_time(t, INTERVALS['10m']) == datetime(2021, 1, 1, 10, 40)
+    assert floor_time(t, INTERVALS['1h']) == datetime(2021, 1, 1, 10)
+
+
+def test_late_trade_becomes_open():
+    builder = CandleBuilder('BTC_KRW', '1m')
+    builder.update(trade(10, 1, '2021-01-01 10:00:30.000000'))
+    builder.update(trade(9, 1, '2021-01-01 10:00:10.000000'))
+    builder.update(trade(11, 1, '2021-01-01 10:00:50'))
+    builder.update(trade(8, 1, '2021-01-01 10:00:40'))
+
+    assert summary(builder) == [('10:00', 9, 11, 8, 11, 4)]
+
+
+def test_late_trade_goes_to_its_own_candle():
+    builder = CandleBuilder('BTC_KRW', '1m')
+    builder.update(trade(10, 1, '2021-01-01 10:00:30'))
+    builder.update(trade(12, 1, '2021-01-01 10:01:05'))
+    builder.update(trade(20, 2, '2021-01-01 10:00:59'))  # 다음 캔들이 열린 뒤 도착
+    builder.update(trade(15, 1, '2021-01-01 10:03:00'))
+    builder.update(trade(14, 1, '2021-01-01 10:02:10'))  # 체결이 없던 구간
+
+    assert summary(builder) == [
+        ('10:00', 10, 20, 10, 20, 3),
+        ('10:01', 12, 12, 12, 12, 1),
+        ('10:02', 14, 14, 14, 14, 1),
+        ('10:03', 15, 15, 15, 15, 1),
+    ]
+
+
+def test_trade_older_than_kept_candles_is_ignored():
+    builder = CandleBuilder('BTC_KRW', '1m', limit=2)
+    builder.update(trade(10, 1, '2021-01-01 10:00:30'))
+    builder.update(trade(11, 1, '2021-01-01 10:01:30'))
+    builder.update(trade(12, 1, '2021-01-01 10:02:30'))
+    builder.update(trade(1, 1, '2021-01-01 10:00:40'))
+
+    assert summary(builder) == [('10:01', 11, 11, 11, 11, 1), ('10:02', 12, 12, 12, 12, 1)]
+
+
+def test_is_stale():
+    builder = CandleBuilder('BTC_KRW', '1m')
+    assert builder.is_stale()
+
+    builder.update(trade(10, 1, '2021-01-01 10:00:30'))
+    assert not builder.is_stale()
+    assert builder.is_stale(periods=0)
+
+
+def test_transaction_records_are_thread_safe():
+    api = TransactionApi(['BTC_KRW'], [TickType.H_HOUR], record_limit=1)
+    update = api.subscribers[0]
+    transaction = Transaction(type='transaction',
+                              content=TransactionContent(list=[trade(1, 1, '2021-01-01 10:00:00')]))
+    errors = []
+
+    def run():
+        for _ in range(1000):
+            try:
+                update(transaction)
+            except BaseException as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(api.records['BTC_KRW']) == 1
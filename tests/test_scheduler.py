@@ -0,0 +1,99 @@
+import threading
+import time
+
+from bithumb.ratelimit import TokenBucket
+from scheduler import Scheduler, Task
+
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=20, capacity=2)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+
+    # 2 개는 바로, 나머지 4 개는 초당 20 개씩
+    assert 0.15 <= time.monotonic() - started < 0.5
+
+
+def test_token_bucket_timeout():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0.05)
+
+
+def test_due_tasks_run_in_priority_order():
+    runs = []
+    blocker = threading.Event()
+    scheduler = Scheduler(processes=1, check_interval=0.05)
+    scheduler.add(Task('block', blocker.wait, 100, priority=0))
+    scheduler.start()
+    time.sleep(0.05)
+
+    # 워커가 막혀 있는 동안 실행 시각이 된 작업들
+    for name, priority in [('idle', 2), ('held', 0), ('volatile', 1)]:
+        scheduler.add(Task(name, lambda name=name: runs.append(name), 100, priority=priority))
+    time.sleep(0.05)
+    blocker.set()
+    time.sleep(0.2)
+    scheduler.stop()
+
+    assert runs == ['held', 'volatile', 'idle']
+
+
+def test_hung_task_is_reported_while_running():
+    release = threading.Event()
+    scheduler = Scheduler(processes=1, check_interval=0.05)
+    scheduler.add(Task('hang', release.wait, 100, deadline=0.1))
+    scheduler.start()
+    time.sleep(0.3)
+    misses = scheduler.get_misses()
+    release.set()
+    scheduler.stop()
+
+    assert [(miss.name, miss.running) for miss in misses] == [('hang', True)]
+
+
+def test_late_task_is_reported_once():
+    scheduler = Scheduler(processes=1, check_interval=10)
+    scheduler.add(Task('slow', lambda: time.sleep(0.2), 100, deadline=0.1))
+    scheduler.start()
+    time.sleep(0.3)
+    scheduler.stop()
+
+    assert [(miss.name, miss.running) for miss in scheduler.get_misses()] == [('slow', False)]
+
+
+def test_failing_priority_does_not_stop_dispatcher():
+    runs = []
+
+    def fail():
+        raise RuntimeError('boom')
+
+    scheduler = Scheduler(processes=1, check_interval=0.05)
+    scheduler.add(Task('bad', lambda: runs.append('bad'), 0.05, priority=fail))
+    scheduler.add(Task('good', lambda: runs.append('good'), 0.05))
+    scheduler.start()
+    time.sleep(0.3)
+    scheduler.stop()
+
+    assert runs.count('bad') > 1
+    assert runs.count('good') > 1
+
+
+def test_stop_does_not_race_dispatcher(monkeypatch):
+    errors = []
+    monkeypatch.setattr(threading, 'excepthook', lambda args: errors.append(args.exc_value))
+
+    for _ in range(20):
+        scheduler = Scheduler(processes=2, check_interval=0.01)
+        for i in range(20):
+            scheduler.add(Task(f'task-{i}', lambda: None, 0.001, deadline=10))
+        scheduler.start()
+        time.sleep(0.01)
+        scheduler.stop()
+
+        assert not scheduler.running
+        assert not scheduler.threads
+        assert scheduler.pool is None
+
+    assert not errors
@@ -0,0 +1,167 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import uuid
+
+import pytest
+
+import bithumb.rest as bithumb_rest
+from bithumb.rest import OrderBook, PriceQuantity
+from bithumb.shared import LatestStateFeed, LatestStateTable, _SEQ
+from bithumb.ws import OrderBookDepth, OrderBookDepthContent, OrderRequest
+
+BITOCK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bitock')
+
+
+def unique_name():
+    return f'bitock_test_{uuid.uuid4().hex[:8]}'
+
+
+@pytest.fixture
+def table():
+    table = LatestStateTable(unique_name(), ['BTC_KRW', 'ETH_KRW'], read_timeout=0.1)
+    yield table
+    table.close()
+
+
+def test_write_and_read(table):
+    table.write('ETH_KRW', closePrice=123.0, bidPrice=122.0)
+    reader = LatestStateTable(table.name)
+
+    assert reader.symbols == ['BTC_KRW', 'ETH_KRW']
+    state = reader.read('ETH_KRW')
+    assert (state.symbol, state.closePrice, state.bidPrice) == ('ETH_KRW', 123.0, 122.0)
+    assert reader.get_changes({}) == ['BTC_KRW', 'ETH_KRW']
+    reader.shm.close()
+
+
+def test_read_times_out_on_dead_writer(table):
+    # 쓰는 도중에 죽은 것처럼 seq 를 홀수로 남김
+    _SEQ.pack_into(table.shm.buf, table._offset(0), 1)
+
+    with pytest.raises(TimeoutError):
+        table.read('BTC_KRW')
+
+
+def _check_consistent(name, count, result):
+    reader = LatestStateTable(name)
+    torn = 0
+    for _ in range(count):
+        state = reader.read('BTC_KRW')
+        if len({state.openPrice, state.closePrice, state.highPrice, state.lowPrice}) != 1:
+            torn += 1
+    reader.shm.close()
+    result.value = torn
+
+
+def test_seqlock_across_processes(table):
+    context = multiprocessing.get_context('spawn')
+    result = context.Value('i', -1)
+    reader = context.Process(target=_check_consistent, args=(table.name, 20000, result))
+    reader.start()
+
+    stopped = threading.Event()
+
+    def write():
+        i = 0
+        while not stopped.is_set():
+            i += 1
+            table.write('BTC_KRW', openPrice=i, closePrice=i, highPrice=i, lowPrice=i)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    reader.join()
+    stopped.set()
+    writer.join()
+
+    assert result.value == 0
+
+
+def run_script(script):
+    env = dict(os.environ, PYTHONPATH=BITOCK)
+    return subprocess.run([sys.executable, '-c', textwrap.dedent(script)],
+                          env=env, capture_output=True, text=True, timeout=60)
+
+
+def test_forked_reader_keeps_owner_registration():
+    completed = run_script(f"""
+        import multiprocessing, time
+        from bithumb.shared import LatestStateTable
+
+        def read(name):
+            LatestStateTable(name).shm.close()
+
+        if __name__ == '__main__':
+            owner = LatestStateTable('{unique_name()}', ['BTC_KRW'])
+            reader = multiprocessing.get_context('fork').Process(target=read, args=(owner.name,))
+            reader.start()
+            reader.join()
+            owner.close()
+            time.sleep(0.5)
+    """)
+
+    assert completed.returncode == 0, completed.stderr
+    assert 'KeyError' not in completed.stderr
+    assert 'leaked' not in completed.stderr
+
+
+def test_unrelated_reader_does_not_unlink_table(table):
+    completed = run_script(f"""
+        from bithumb.shared import LatestStateTable
+        LatestStateTable('{table.name}').shm.close()
+    """)
+
+    assert completed.returncode == 0, completed.stderr
+    # 읽기만 한 프로세스가 끝나도 테이블은 남아 있어야 함
+    LatestStateTable(table.name).shm.close()
+
+
+def depth(t, *orders):
+    return OrderBookDepth(type='orderbookdepth',
+                          content=OrderBookDepthContent(datetime=t, list=[
+                              OrderRequest(symbol='BTC_KRW', orderType=side, price=str(price), quantity=str(quantity))
+                              for side, price, quantity in orders
+                          ]))
+
+
+@pytest.fixture
+def feed():
+    feed = LatestStateFeed(unique_name(), ['BTC_KRW'])
+    yield feed
+    feed.table.close()
+
+
+def top(feed):
+    state = feed.table.read('BTC_KRW')
+    return state.bidPrice, state.askPrice
+
+
+def test_seed_replays_only_frames_newer_than_snapshot(feed, monkeypatch):
+    def get_orderbook(symbol, limit=30):
+        # 스냅샷을 받는 동안 들어온 변경분 (μs)
+        feed.on_order_book_depth(depth(1_600_000_000_000_000 - 1000, ('bid', 99, 1)))  # 스냅샷 이전: 버림
+        feed.on_order_book_depth(depth(1_600_000_000_000_000 + 1000, ('ask', 101, 0)))  # 스냅샷 이후: 적용
+        return OrderBook(timestamp='1600000000000',
+                         bids=[PriceQuantity(price='100', quantity='1')],
+                         asks=[PriceQuantity(price='101', quantity='1'), PriceQuantity(price='102', quantity='1')])
+
+    monkeypatch.setattr(bithumb_rest, 'get_orderbook', get_orderbook)
+    feed.seed()
+    assert feed.books['BTC_KRW'] == {'bid': {100.0: 1.0}, 'ask': {102.0: 1.0}}
+    assert top(feed) == (100.0, 102.0)
+
+    # 스냅샷 이전 변경분이 늦게 도착해도 버림
+    feed.on_order_book_depth(depth(1_600_000_000_000_000 - 500, ('ask', 101, 5)))
+    assert top(feed) == (100.0, 102.0)
+
+
+def test_crossing_levels_are_pruned(feed):
+    feed.on_order_book_depth(depth(None, ('bid', 100, 1), ('ask', 101, 1), ('ask', 102, 1)))
+    assert top(feed) == (100.0, 101.0)
+
+    # 101 매도 호가가 사라진 변경분을 놓쳤더라도, 그보다 새로운 매수 호가가 우선함
+    feed.on_order_book_depth(depth(None, ('bid', 101, 2)))
+    assert top(feed) == (101.0, 102.0)
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from bithumb.ws import MessageQueue, OverflowPolicy, TickerApi, TickerData, TickerDataContent, TickType
+
+
+def test_conflate_keeps_latest_per_key():
+    queue = MessageQueue(policy=OverflowPolicy.CONFLATE, key=lambda data: data[0])
+    for data in [('A', 1), ('B', 1), ('A', 2), ('A', 3)]:
+        queue.put(data)
+
+    # A 는 처음 자리를 유지하고 값만 최신으로 바뀜
+    assert [queue.get(), queue.get(), queue.get(timeout=0.01)] == [('A', 3), ('B', 1), None]
+    stats = queue.get_stats()
+    assert (stats.received, stats.delivered, stats.conflated, stats.dropped) == (4, 2, 2, 0)
+
+
+def test_conflate_requires_key():
+    with pytest.raises(AssertionError):
+        MessageQueue(policy=OverflowPolicy.CONFLATE)
+
+
+@pytest.mark.parametrize('policy, expected', [
+    (OverflowPolicy.DROP_OLDEST, [3, 4]),
+    (OverflowPolicy.DROP_NEWEST, [0, 1]),
+])
+def test_drop_policies(policy, expected):
+    queue = MessageQueue(maxsize=2, policy=policy)
+    for i in range(5):
+        queue.put(i)
+
+    assert [queue.get(), queue.get()] == expected
+    assert queue.get_stats().dropped == 3
+
+
+def test_block_waits_for_room():
+    queue = MessageQueue(maxsize=1, policy=OverflowPolicy.BLOCK)
+    queue.put(0)
+    putter = threading.Thread(target=queue.put, args=(1,))
+    putter.start()
+    time.sleep(0.05)
+    assert putter.is_alive()
+
+    assert queue.get() == 0
+    putter.join(timeout=1)
+    assert not putter.is_alive()
+    assert queue.get() == 1
+    assert queue.get_stats().dropped == 0
+
+
+def test_close_wakes_blocked_threads():
+    queue = MessageQueue(maxsize=1, policy=OverflowPolicy.BLOCK)
+    queue.put(0)
+    putter = threading.Thread(target=queue.put, args=(1,))
+    putter.start()
+    queue.close()
+    putter.join(timeout=1)
+
+    assert not putter.is_alive()
+
+
+def test_age_is_reported():
+    queue = MessageQueue()
+    queue.put(0)
+    time.sleep(0.05)
+    queue.get()
+
+    stats = queue.get_stats(reset=True)
+    assert stats.last_age >= 0.05
+    assert stats.max_age >= 0.05
+    assert queue.get_stats().max_age == 0
+
+
+def ticker(symbol):
+    return TickerData(type='ticker', content=TickerDataContent(symbol=symbol, tickType='24H'))
+
+
+def test_failing_subscriber_does_not_block_others():
+    api = TickerApi(['BTC_KRW'], [TickType.DAY])
+    received = []
+
+    def fail(data):
+        raise RuntimeError('boom')
+
+    api.subscribe(fail).subscribe(received.append)
+    consumer = threading.Thread(target=api.start_consume, args=(1,))
+    consumer.start()
+    for symbol in ['BTC_KRW', 'ETH_KRW', 'XRP_KRW']:
+        api.queue.put(ticker(symbol))
+    time.sleep(0.2)
+    api.disconnect()
+    consumer.join(timeout=5)
+
+    assert [data.content.symbol for data in received] == ['BTC_KRW', 'ETH_KRW', 'XRP_KRW']
+
+
+def test_report_warns_on_drops(caplog):
+    api = TickerApi(['BTC_KRW'], [TickType.DAY], queue_size=1, overflow=OverflowPolicy.DROP_OLDEST)
+    api.queue.put(ticker('BTC_KRW'))
+    api.queue.put(ticker('BTC_KRW'))
+
+    with caplog.at_level('INFO', logger='BithumbWebsocket'):
+        api.report()
+        api.report()
+
+    assert [record.levelname for record in caplog.records] == ['WARNING', 'INFO']